@@ -385,6 +385,64 @@ def make_list_from_string_field(ad, key, split_re=r"[\s,]+\s*", default=None):
         return default
 
 
+# Attributes consumed by name in to_json() and its helpers, beyond the
+# typed schema attributes above.
+_SPECIAL_ATTRS = {
+    "BytesRecvd",
+    "BytesSent",
+    "CommittedTime",
+    "CompletionDate",
+    "CpuEventRate",
+    "CpuTimePerEvent",
+    "CpusProvisioned",
+    "CreamAttributes",
+    "DiskUsage_RAW",
+    "EnteredCurrentStatus",
+    "EventRate",
+    "ExitCode",
+    "GLIDEIN_Cpus",
+    "GlideinEntryName",
+    "GlobalJobId",
+    "GpusProvisioned",
+    "JobCurrentStartDate",
+    "JobExitCode",
+    "JobStatus",
+    "JobUniverse",
+    "LastRemoteHost",
+    "MATCH_EXP_JOBGLIDEIN_ResourceName",
+    "MachineAttrCPUModel0",
+    "MachineAttrDIRACBenchmark0",
+    "MachineAttrMJF_JOB_HS06_JOB0",
+    "NordugridRSL",
+    "QDate",
+    "RemoteHost",
+    "RemoteSysCpu",
+    "RemoteUserCpu",
+    "RemoteWallClockTime",
+    "RequestCpus",
+    "RequestGpus",
+    "ResidentSetSize_RAW",
+    "TaskType",
+    "TimePerEvent",
+    "xcount",
+}
+
+# Projection passed to schedd/startd history queries so HTCondor only
+# ships the attributes we actually convert, rather than the full ad.
+# Dynamically named attributes (the Chirp_WMCore_*_Exception_Message
+# family matched by WMCORE_EXE_EXMSG_RE) cannot be listed in a static
+# projection; that converter branch only fires with --full_attrs.
+WANTED_ATTRS = sorted(
+    set(TEXT_ATTRS)
+    | set(INDEXED_KEYWORD_ATTRS)
+    | set(NOINDEX_KEYWORD_ATTRS)
+    | set(FLOAT_ATTRS)
+    | set(INT_ATTRS)
+    | set(DATE_ATTRS)
+    | set(BOOL_ATTRS)
+    | _SPECIAL_ATTRS
+)
+
 CREAM_RE = re.compile(r"CPUNumber = (\d+)")
 NORDUGRID_RE = re.compile(r"\(count=(\d+)\)")
 # Executable error messages in WMCore
@@ -654,7 +712,7 @@ def bulk_convert_ad_data(ad, result):
                     value = None
                 else:
                     logging.warning(
-                        f"Failed to convert key {key} with value {repr(value)} to float"
+                        "Failed to convert key %s with value %r to float", key, value
                     )
                     continue
         elif key in INT_ATTRS:
@@ -665,7 +723,7 @@ def bulk_convert_ad_data(ad, result):
                     value = None
                 else:
                     logging.warning(
-                        f"Failed to convert key {key} with value {repr(value)} to int"
+                        "Failed to convert key %s with value %r to int", key, value
                     )
                     continue
         elif key in BOOL_ATTRS:
@@ -678,8 +736,9 @@ def bulk_convert_ad_data(ad, result):
                     value = int(value)
                 except ValueError:
                     logging.warning(
-                        "Failed to convert key %s with value %s to int for a date field"
-                        % (key, repr(value))
+                        "Failed to convert key %s with value %r to int for a date field",
+                        key,
+                        value,
                     )
                     value = None
 
@@ -693,7 +752,7 @@ def decode_and_decompress(value):
     try:
         return str(zlib.decompress(base64.b64decode(value)))
     except (TypeError, zlib.error):
-        logging.warning(f"Failed to decode and decompress value: {repr(value)}")
+        logging.warning("Failed to decode and decompress value: %r", value)
 
 
 def convert_dates_to_millisecs(record):
@@ -723,7 +782,11 @@ def unique_doc_id(doc):
     Return a string of format "<GlobalJobId>#<RecordTime>"
     To uniquely identify documents (not jobs)
 
+    The raw string is used as the ES _id on purpose: it stays well under
+    the 512-byte _id limit and skips any per-document hashing on the hot
+    path.
+
     Note that this uniqueness breaks if the same jobs are submitted
     with the same RecordTime
     """
-    return "%s#%d" % (doc["GlobalJobId"], doc["RecordTime"])
+    return f"{doc['GlobalJobId']}#{doc['RecordTime']:d}"
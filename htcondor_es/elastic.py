@@ -6,8 +6,10 @@ import time
 import datetime
 import logging
 import socket
+import threading
 import collections
 
+import orjson
 import elasticsearch
 import importlib.util
 
@@ -101,6 +103,17 @@ def make_settings():
 _ES_HANDLE = None
 
 
+def reset_server_handle():
+    """
+    Drop any inherited client. Meant as a pool initializer for forked
+    uploader processes: sharing the parent's open keep-alive sockets
+    across a fork would corrupt the HTTP exchanges, so each worker must
+    build its own handle via get_server_handle.
+    """
+    global _ES_HANDLE
+    _ES_HANDLE = None
+
+
 def get_server_handle(args=None):
     global _ES_HANDLE
     if not _ES_HANDLE:
@@ -110,14 +123,15 @@ def get_server_handle(args=None):
             )
             return _ES_HANDLE
         _ES_HANDLE = ElasticInterface(hostname=args.es_host, port=args.es_port,
-          username=args.es_username, password=args.es_password, use_https=args.es_use_https)
+          username=args.es_username, password=args.es_password, use_https=args.es_use_https,
+          maxsize=args.upload_pool_size * 2)
     return _ES_HANDLE
 
 
 class ElasticInterface(object):
     """Interface to elasticsearch"""
 
-    def __init__(self, hostname="localhost", port=9200, username=None, password=None, use_https=False):
+    def __init__(self, hostname="localhost", port=9200, username=None, password=None, use_https=False, maxsize=8):
 
         es_client = {
             'host': hostname,
@@ -140,7 +154,88 @@ class ElasticInterface(object):
                 es_client['use_ssl'] = True
                 es_client['verify_certs'] = True
 
-        self.handle = elasticsearch.Elasticsearch([es_client])
+        # ClassAd JSON is highly repetitive, so gzipping the request
+        # bodies cuts bulk payloads several-fold for a little CPU. The
+        # pool is sized for the parallel uploader threads.
+        self.handle = elasticsearch.Elasticsearch(
+            [es_client],
+            http_compress=True,
+            timeout=120,
+            maxsize=maxsize,
+        )
+        self._bulk_prepared = set()
+        self._bulk_saved_settings = {}
+
+    def prepare_index_for_bulk(self, idx):
+        """
+        Disable the refresh interval and replicas on an index while we
+        bulk-load history into it, remembering the explicit settings it
+        had so restore_bulk_settings() can put them back.
+        """
+        if idx in self._bulk_prepared:
+            return
+        self._bulk_prepared.add(idx)
+        try:
+            current = (
+                self.handle.indices.get_settings(
+                    index=idx,
+                    name="index.refresh_interval,index.number_of_replicas",
+                )
+                .get(idx, {})
+                .get("settings", {})
+                .get("index", {})
+            )
+            # Settings the index never set explicitly are saved as None
+            # and restored as null, i.e. back to the index default
+            self._bulk_saved_settings[idx] = {
+                "refresh_interval": current.get("refresh_interval"),
+                "number_of_replicas": current.get("number_of_replicas"),
+            }
+            self.handle.indices.put_settings(
+                index=idx,
+                body={"index": {"refresh_interval": "-1", "number_of_replicas": 0}},
+            )
+        except elasticsearch.exceptions.TransportError as exn:
+            logging.warning(f"Failed to prepare index {idx} for bulk load: {exn}")
+
+    def restore_bulk_settings(self, indices):
+        """
+        Put back the settings each index had before its bulk load and
+        force-merge the freshly written segments.
+        """
+        if not indices:
+            return
+        # Forget these indices so a later bulk phase on the same handle
+        # (e.g. startd history after schedd history) re-prepares them
+        self._bulk_prepared.difference_update(indices)
+        for idx in sorted(indices):
+            saved = self._bulk_saved_settings.pop(idx, {})
+            try:
+                self.handle.indices.put_settings(
+                    index=idx,
+                    body={
+                        "index": {
+                            "refresh_interval": saved.get("refresh_interval"),
+                            "number_of_replicas": saved.get("number_of_replicas"),
+                        }
+                    },
+                )
+            except elasticsearch.exceptions.TransportError as exn:
+                logging.warning(f"Failed to restore bulk settings on {idx}: {exn}")
+        idx = ",".join(sorted(indices))
+        try:
+            self.handle.indices.forcemerge(index=idx, max_num_segments=5)
+        except elasticsearch.exceptions.TransportError as exn:
+            logging.warning(f"Failed to force-merge {idx}: {exn}")
+
+    def restore_all_bulk_settings(self):
+        """
+        Restore every index this handle prepared. Called at the end of
+        a history phase so indices touched by a worker that timed out
+        (and never reported its index set) are not left without refresh
+        or replicas.
+        """
+        self.restore_bulk_settings(list(self._bulk_prepared))
 
     def fix_mapping(self, idx, template="htcondor"):
         idx_clt = elasticsearch.client.IndicesClient(self.handle)
@@ -218,28 +313,157 @@ def make_es_body(ads, metadata=None):
 
 
 def parse_errors(result):
+    # Responses are filtered down to status/error per item, so successful
+    # documents contribute no error entry here
     reasons = [
-        d.get("index", {}).get("error", {}).get("reason", None) for d in result["items"]
+        d.get("index", {}).get("error", {}).get("reason", None)
+        for d in result.get("items", [])
     ]
     counts = collections.Counter([_f for _f in reasons if _f])
     n_failed = sum(counts.values())
     logging.error(
-        f"Failed to index {n_failed:d} documents to ES: {str(counts.most_common(3))}"
+        "Failed to index %d documents to ES: %s", n_failed, counts.most_common(3)
     )
     return n_failed
 
 
 def post_ads(es, idx, ads, metadata=None):
     body = make_es_body(ads, metadata)
-    res = es.bulk(body=body, index=idx, request_timeout=60)
+    res = es.bulk(
+        body=body,
+        index=idx,
+        request_timeout=60,
+        filter_path="errors,items.*.status,items.*.error",
+    )
+    if res.get("errors"):
+        return parse_errors(res)
+
+
+def serialize_bulk_doc(id_, ad, metadata=None):
+    """
+    Pre-serialize one document into its NDJSON bulk action+source lines.
+
+    orjson is several times faster than the stdlib json module here, and
+    serializing in the producer means the uploader threads only have to
+    concatenate bytes.
+    """
+    if metadata:
+        ad.setdefault("metadata", {}).update(metadata)
+    return (
+        orjson.dumps({"index": {"_id": id_}})
+        + b"\n"
+        + orjson.dumps(ad, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        + b"\n"
+    )
+
+
+class BunchTuner(object):
+    """
+    AIMD controller for the bulk flush threshold of one daemon.
+
+    The optimal bulk size is workload-dependent, so instead of a fixed
+    --es_bunch_size the producer reads .size while the uploader threads
+    report outcomes: the bunch grows by 25% while bulks keep succeeding
+    and halves when ES pushes back or a bulk fails, bounded by
+    [min_size, max_size]. Byte-based limits are enforced separately by
+    the producer via --es_max_chunk_bytes.
+    """
+
+    def __init__(self, size, min_size=100, max_size=5000):
+        self.size = min(max(size, min_size), max_size)
+        self.min_size = min_size
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+    def success(self):
+        with self._lock:
+            self.size = min(int(self.size * 1.25), self.max_size)
+
+    def failure(self):
+        with self._lock:
+            self.size = max(self.size // 2, self.min_size)
+
+
+def post_ads_raw(handle, idx, ndjson_bytes):
+    """
+    Post a pre-serialized NDJSON bulk body straight to the bulk endpoint.
+
+    Metadata is already baked into the source lines by
+    serialize_bulk_doc(), and filter_path keeps ES from echoing the full
+    per-document bookkeeping back in the response.
+
+    Returns the number of documents that failed to index.
+    """
+    res = handle.bulk(
+        body=ndjson_bytes,
+        index=idx,
+        request_timeout=60,
+        filter_path="errors,items.*.status,items.*.error",
+    )
     if res.get("errors"):
         return parse_errors(res)
 
+    return 0
+
+
+def parallel_post_ads(es, batch_queue, thread_count=4, tuner=None):
+    """
+    Drain (index, [ndjson_bytes, ...]) batches from batch_queue and post
+    them from thread_count uploader threads, so several bulk requests are
+    in flight while the producer keeps streaming ads. The raw NDJSON body
+    goes straight to the bulk endpoint, skipping the re-serialization the
+    elasticsearch.helpers wrappers would do.
+
+    The producer signals completion with a single None; each worker
+    re-queues the pill for its siblings before exiting.
+
+    Returns the number of documents that failed to index.
+    """
+    failures = []
+
+    def _worker():
+        n_failed = 0
+        while True:
+            item = batch_queue.get()
+            if item is None:
+                batch_queue.put(None)  # Propagate the pill to the siblings
+                break
+            idx, batch = item
+            try:
+                failed = post_ads_raw(es, idx, b"".join(batch))
+            except Exception:
+                logging.exception("Bulk upload to ES failed")
+                # The whole batch was dropped; count it so callers can
+                # refuse to advance their checkpoint over the gap
+                n_failed += len(batch)
+                if tuner is not None:
+                    tuner.failure()
+                continue
+            n_failed += failed
+            if tuner is not None:
+                if failed:
+                    tuner.failure()
+                else:
+                    tuner.success()
+        failures.append(n_failed)
+
+    workers = [threading.Thread(target=_worker) for _ in range(thread_count)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(failures)
+
 
 def post_ads_nohandle(idx, ads, args, metadata=None):
     es = get_server_handle(args).handle
     body = make_es_body(ads, metadata)
-    res = es.bulk(body=body, index=idx, request_timeout=60)
+    res = es.bulk(
+        body=body,
+        index=idx,
+        request_timeout=60,
+        filter_path="errors,items.*.status,items.*.error",
+    )
     if res.get("errors"):
         return parse_errors(res)
 
@@ -4,11 +4,18 @@ Methods for processing the history in a schedd queue.
 
 import json
 import time
+import queue
+import sqlite3
 import logging
+import functools
 import datetime
+import tempfile
+import threading
 import traceback
-import multiprocessing
+import subprocess
+import concurrent.futures
 
+import orjson
 import classad
 import htcondor
 import elasticsearch
@@ -17,6 +24,35 @@ from . import elastic, utils, convert
 
 _LAUNCH_TIME = int(time.time())
 
+# Check timeout/document limits only every 256 ads; at typical ad rates
+# this keeps the exit checks sub-second while dropping 255 of every 256
+# clock reads from the hot loop.
+_CHECK_MASK = 0xFF
+
+
+def _log_with_tb(level, message):
+    """
+    Log message with the current traceback appended, but only pay for
+    traceback.format_exc() (which walks the whole stack) when the level
+    is actually enabled. Returns the logged message so callers can reuse
+    it for email alerts.
+    """
+    logger = logging.getLogger()
+    if logger.isEnabledFor(level):
+        message = f"{message}\n{traceback.format_exc()}"
+    logger.log(level, message)
+    return message
+
+
+# Attrs already flagged as unusable timestamps, so a malformed value
+# costs one log line per attribute instead of one per ad
+_BAD_TIME_ATTRS = set()
+
+
+def _coerce_time(value):
+    """Return value if it is a usable epoch timestamp, else 0"""
+    return value if isinstance(value, (int, float)) and value > 0 else 0
+
 
 def index_time(index_attr, ad):
     """
@@ -25,24 +61,93 @@ def index_time(index_attr, ad):
         - else EnteredCurrentStatus if present
         - else QDate if present
         - else fall back to launch time
+
+    This runs once per ad, so malformed values are detected with an
+    isinstance check rather than a try/except around int().
     """
-    try:
-        if int(ad.get(index_attr, 0)) > 0:
-            return ad[index_attr]
-    except (ValueError, TypeError):
-        logging.error(f"The value of {index_attr} is not numeric and cannot be used as a timestamp, falling back to EnteredCurrentStatus")
+    preferred = ad.get(index_attr)
+    if preferred is not None and not isinstance(preferred, (int, float)):
+        if index_attr not in _BAD_TIME_ATTRS:
+            _BAD_TIME_ATTRS.add(index_attr)
+            logging.warning(
+                "The value of %s is not numeric and cannot be used as a timestamp, "
+                "falling back to EnteredCurrentStatus",
+                index_attr,
+            )
+        preferred = 0
+
+    return (
+        _coerce_time(preferred)
+        or _coerce_time(ad.get("EnteredCurrentStatus"))
+        or _coerce_time(ad.get("QDate"))
+        or _LAUNCH_TIME
+    )
 
-    if ad.get("EnteredCurrentStatus", 0) > 0:
-        return ad["EnteredCurrentStatus"]
 
-    if ad.get("QDate", 0) > 0:
-        return ad["QDate"]
+@functools.lru_cache(maxsize=128)
+def _cached_get_index(day_bucket, template, update_es):
+    """
+    Memoized elastic.get_index keyed by UTC day instead of raw epoch,
+    since consecutive ads almost always land in the same daily index.
+    Avoids a strftime (and potentially an index-creation round-trip)
+    per document.
+    """
+    return elastic.get_index(day_bucket * 86400, template=template, update_es=update_es)
+
 
-    return _LAUNCH_TIME
+def _history_from_binary(schedd_ad, history_query, match, projection):
+    """
+    Stream history ads from the condor_history binary instead of the
+    Python bindings. The JSONL output is parsed with orjson and wrapped
+    back into ClassAds, replacing the per-attribute object construction
+    the bindings perform with a byte-stream parser.
+    """
+    cmd = [
+        "condor_history",
+        "-name",
+        schedd_ad["Name"],
+        "-pool",
+        schedd_ad["MyPool"],
+        "-jsonl",
+        "-constraint",
+        str(history_query),
+        "-match",
+        str(match),
+    ]
+    if projection:
+        cmd += ["-attributes", ",".join(projection)]
+
+    # stderr goes to a temp file rather than a pipe: a pipe would fill
+    # up if condor_history emits more than a buffer's worth of warnings
+    # while we are still streaming stdout, deadlocking both processes.
+    with tempfile.TemporaryFile() as errfile:
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=errfile, bufsize=1 << 20
+        )
+        try:
+            for line in proc.stdout:
+                if line.strip():
+                    yield classad.ClassAd(orjson.loads(line))
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+            errfile.seek(0)
+            stderr = errfile.read().decode(errors="replace").strip()
+
+    # A failing condor_history (unknown schedd, network error, missing
+    # -jsonl support) produces no output, which would otherwise look
+    # like a legitimately empty history. Raise RuntimeError to match
+    # what the bindings path does on a failed query.
+    if returncode:
+        raise RuntimeError(
+            f"condor_history for {schedd_ad['Name']} exited with status "
+            f"{returncode}: {stderr}"
+        )
 
 
 def process_schedd(
-    start_time, last_completion, checkpoint_queue, schedd_ad, args, metadata=None
+    start_time, last_completion, checkpoint_queue, schedd_ad, args, metadata=None,
+    es_handle=None,
 ):
     """
     Given a schedd, process its entire set of history since last checkpoint.
@@ -68,26 +173,66 @@ def process_schedd(
         (time.time() - last_completion) / 60.0,
     )
     buffered_ads = {}
+    buffered_bytes = {}
+    touched_indices = set()
+    checkpoint_completion = last_completion
     count = 0
+    overlap_skipped = 0
     total_upload = 0
     sent_warnings = False
     timed_out = False
+    upload_queue = queue.Queue(maxsize=4)
+    uploader = None
+    upload_failed = []  # filled with the uploader's failed-document count
+    tuner = elastic.BunchTuner(args.es_bunch_size)
     if not args.read_only and args.es_feed_schedd_history:
-        es = elastic.get_server_handle(args)
+        es = es_handle if es_handle is not None else elastic.get_server_handle(args)
+        uploader = threading.Thread(
+            target=lambda: upload_failed.append(
+                elastic.parallel_post_ads(
+                    es.handle,
+                    upload_queue,
+                    thread_count=args.upload_pool_size,
+                    tuner=tuner,
+                )
+            ),
+        )
+        uploader.start()
+    if args.full_attrs:
+        projection = []
+    else:
+        projection = sorted(set(convert.WANTED_ATTRS) | {args.es_index_date_attr})
     try:
-        if not args.dry_run:
-            history_iter = schedd.history(history_query, [], max(10000, args.process_max_documents))
-        else:
+        if args.dry_run:
             history_iter = []
+        elif args.use_condor_history_binary:
+            history_iter = _history_from_binary(
+                schedd_ad,
+                history_query,
+                max(10000, args.process_max_documents),
+                projection,
+            )
+        else:
+            history_iter = schedd.history(history_query, projection, max(10000, args.process_max_documents))
 
         for job_ad in history_iter:
+            # The query boundary is deliberately inclusive (a job can
+            # complete in the checkpoint second but have its ad written
+            # after that run's query), so only skip ads strictly older
+            # than the checkpoint; boundary-second ads are re-indexed,
+            # which is harmless since document ids are idempotent
+            ecs = job_ad.get("EnteredCurrentStatus", 0)
+            if 0 < ecs < checkpoint_completion:
+                overlap_skipped += 1
+                continue
+
             try:
                 dict_ad = convert.to_json(job_ad, return_dict=True)
             except Exception as e:
-                message = f"Failure when converting document on {schedd_ad['Name']} history: {e}"
-                exc = traceback.format_exc()
-                message += f"\n{exc}"
-                logging.warning(message)
+                message = _log_with_tb(
+                    logging.WARNING,
+                    f"Failure when converting document on {schedd_ad['Name']} history: {e}",
+                )
                 if not sent_warnings:
                     utils.send_email_alert(
                         args.email_alerts,
@@ -98,18 +243,28 @@ def process_schedd(
 
                 continue
 
-            idx = elastic.get_index(
-                index_time(args.es_index_date_attr, job_ad),
-                template=args.es_index_name,
-                update_es=(args.es_feed_schedd_history and not args.read_only),
+            idx = _cached_get_index(
+                int(index_time(args.es_index_date_attr, job_ad)) // 86400,
+                args.es_index_name,
+                (args.es_feed_schedd_history and not args.read_only),
+            )
+            if uploader is not None and idx not in touched_indices:
+                es.prepare_index_for_bulk(idx)
+                touched_indices.add(idx)
+            doc = elastic.serialize_bulk_doc(
+                convert.unique_doc_id(dict_ad), dict_ad, metadata=metadata
             )
             ad_list = buffered_ads.setdefault(idx, [])
-            ad_list.append((convert.unique_doc_id(dict_ad), dict_ad))
+            ad_list.append(doc)
+            buffered_bytes[idx] = buffered_bytes.get(idx, 0) + len(doc)
 
-            if len(ad_list) == args.es_bunch_size:
+            if (
+                len(ad_list) >= tuner.size
+                or buffered_bytes[idx] >= args.es_max_chunk_bytes
+            ):
                 st = time.time()
-                if not args.read_only and args.es_feed_schedd_history:
-                    elastic.post_ads(es.handle, idx, ad_list, metadata=metadata)
+                if uploader is not None:
+                    upload_queue.put((idx, ad_list))
                 logging.debug(
                     "...posting %d ads from %s (process_schedd)",
                     len(ad_list),
@@ -117,14 +272,17 @@ def process_schedd(
                 )
                 total_upload += time.time() - st
                 buffered_ads[idx] = []
+                buffered_bytes[idx] = 0
 
             count += 1
 
             # Find the most recent job and use that date as the new
             # last_completion date
-            job_completion = job_ad.get("EnteredCurrentStatus")
-            if job_completion > last_completion:
-                last_completion = job_completion
+            if ecs > last_completion:
+                last_completion = ecs
+
+            if count & _CHECK_MASK:
+                continue
 
             if utils.time_remaining(start_time) < 0:
                 message = f"History crawler on {schedd_ad['Name']} has been running for more than {utils.TIMEOUT_MINS:d} minutes; exiting."
@@ -137,37 +295,43 @@ def process_schedd(
 
             if args.process_max_documents and count > args.process_max_documents:
                 logging.warning(
-                    "Aborting after %d documents (--process_max_documents option)"
-                    % args.process_max_documents
+                    "Aborting after %d documents (--process_max_documents option)",
+                    args.process_max_documents,
                 )
                 break
 
     except RuntimeError:
-        message = "Failed to query schedd for job history: %s" % schedd_ad["Name"]
-        exc = traceback.format_exc()
-        message += f"\n{exc}"
-        logging.error(message)
+        _log_with_tb(
+            logging.ERROR, "Failed to query schedd for job history: %s" % schedd_ad["Name"]
+        )
 
     except Exception as exn:
-        message = f"Failure when processing schedd history query on {schedd_ad['Name']}: {str(exn)}"
-        exc = traceback.format_exc()
-        message += f"\n{exc}"
-        logging.exception(message)
+        message = _log_with_tb(
+            logging.ERROR,
+            f"Failure when processing schedd history query on {schedd_ad['Name']}: {str(exn)}",
+        )
         utils.send_email_alert(
             args.email_alerts, "spider schedd history query error", message
         )
 
-    # Post the remaining ads
-    for idx, ad_list in list(buffered_ads.items()):
-        if ad_list:
-            logging.debug(
-                "...posting remaining %d ads from %s " "(process_schedd)",
-                len(ad_list),
-                schedd_ad["Name"],
-            )
-            if not args.read_only:
-                if args.es_feed_schedd_history:
-                    elastic.post_ads(es.handle, idx, ad_list, metadata=metadata)
+    finally:
+        # Post the remaining ads and wait for the uploader to drain;
+        # this must run on every exit path or the uploader thread would
+        # block forever on an empty queue.
+        st = time.time()
+        for idx, ad_list in list(buffered_ads.items()):
+            if ad_list:
+                logging.debug(
+                    "...posting remaining %d ads from %s " "(process_schedd)",
+                    len(ad_list),
+                    schedd_ad["Name"],
+                )
+                if uploader is not None:
+                    upload_queue.put((idx, ad_list))
+        if uploader is not None:
+            upload_queue.put(None)  # Send a poison pill
+            uploader.join()
+            total_upload += time.time() - st
 
     total_time = (time.time() - my_start) / 60.0
     total_upload /= 60.0
@@ -175,28 +339,40 @@ def process_schedd(
         "%Y-%m-%d %H:%M:%S"
     )
     logging.warning(
-        "Schedd %-25s history: response count: %5d; last completion %s; query time %.2f min; upload time %.2f min",
+        "Schedd %-25s history: response count: %5d; overlap skipped: %d; last completion %s; query time %.2f min; upload time %.2f min",
         schedd_ad["Name"],
         count,
+        overlap_skipped,
         last_formatted,
         total_time - total_upload,
         total_upload,
     )
 
-    # If we got to this point without a timeout, all these jobs have
-    # been processed and uploaded, so we can update the checkpoint
-    if not timed_out:
+    n_failed = upload_failed[0] if upload_failed else 0
+    if n_failed:
+        logging.error(
+            "%d documents from %s failed to upload; not advancing the checkpoint",
+            n_failed,
+            schedd_ad["Name"],
+        )
+
+    # Only update the checkpoint if we got here without a timeout and
+    # every document actually reached ES; advancing it over a failed
+    # bulk would skip those ads forever
+    if not timed_out and not n_failed:
         checkpoint_queue.put((schedd_ad["Name"], last_completion))
 
     return last_completion
 
 def process_startd(
-    start_time, since, checkpoint_queue, startd_ad, args, metadata=None
+    start_time, since, checkpoint_queue, startd_ad, args, metadata=None,
+    es_handle=None,
 ):
     """
     Given a startd, process its entire set of history since last checkpoint.
     """
     last_completion = since["EnteredCurrentStatus"]
+    last_ad = None
     since_str = f"""(GlobalJobId == "{since['GlobalJobId']}") && (EnteredCurrentStatus == {since['EnteredCurrentStatus']})"""
     my_start = time.time()
     if utils.time_remaining(start_time) < 0:
@@ -216,26 +392,53 @@ def process_startd(
         startd_ad["Machine"]
     )
     buffered_ads = {}
+    buffered_bytes = {}
+    touched_indices = set()
     count = 0
     total_upload = 0
     sent_warnings = False
     timed_out = False
+    upload_queue = queue.Queue(maxsize=4)
+    uploader = None
+    upload_failed = []  # filled with the uploader's failed-document count
+    tuner = elastic.BunchTuner(args.es_bunch_size)
     if not args.read_only and args.es_feed_startd_history:
-        es = elastic.get_server_handle(args)
+        es = es_handle if es_handle is not None else elastic.get_server_handle(args)
+        uploader = threading.Thread(
+            target=lambda: upload_failed.append(
+                elastic.parallel_post_ads(
+                    es.handle,
+                    upload_queue,
+                    thread_count=args.upload_pool_size,
+                    tuner=tuner,
+                )
+            ),
+        )
+        uploader.start()
+    if args.full_attrs:
+        projection = []
+    else:
+        projection = sorted(set(convert.WANTED_ATTRS) | {args.es_index_date_attr})
     try:
         if not args.dry_run:
-            history_iter = startd.history("True", [], since=since_str)
+            history_iter = startd.history("True", projection, since=since_str)
         else:
             history_iter = []
 
         for job_ad in history_iter:
+            # No overlap skip here: the since marker already stops the
+            # iteration at the last indexed ad, so anything returned with
+            # an older EnteredCurrentStatus is an unseen ad whose history
+            # write was merely delayed
+            ecs = job_ad.get("EnteredCurrentStatus", 0)
+
             try:
                 dict_ad = convert.to_json(job_ad, return_dict=True)
             except Exception as e:
-                message = f"Failure when converting document on {startd_ad['Machine']} history: {e}"
-                exc = traceback.format_exc()
-                message += f"\n{exc}"
-                logging.warning(message)
+                message = _log_with_tb(
+                    logging.WARNING,
+                    f"Failure when converting document on {startd_ad['Machine']} history: {e}",
+                )
                 if not sent_warnings:
                     utils.send_email_alert(
                         args.email_alerts,
@@ -246,18 +449,28 @@ def process_startd(
 
                 continue
 
-            idx = elastic.get_index(
-                index_time(args.es_index_date_attr, job_ad),
-                template=args.es_index_name,
-                update_es=(args.es_feed_startd_history and not args.read_only),
+            idx = _cached_get_index(
+                int(index_time(args.es_index_date_attr, job_ad)) // 86400,
+                args.es_index_name,
+                (args.es_feed_startd_history and not args.read_only),
+            )
+            if uploader is not None and idx not in touched_indices:
+                es.prepare_index_for_bulk(idx)
+                touched_indices.add(idx)
+            doc = elastic.serialize_bulk_doc(
+                convert.unique_doc_id(dict_ad), dict_ad, metadata=metadata
             )
             ad_list = buffered_ads.setdefault(idx, [])
-            ad_list.append((convert.unique_doc_id(dict_ad), dict_ad))
+            ad_list.append(doc)
+            buffered_bytes[idx] = buffered_bytes.get(idx, 0) + len(doc)
 
-            if len(ad_list) == args.es_bunch_size:
+            if (
+                len(ad_list) >= tuner.size
+                or buffered_bytes[idx] >= args.es_max_chunk_bytes
+            ):
                 st = time.time()
-                if not args.read_only and args.es_feed_startd_history:
-                    elastic.post_ads(es.handle, idx, ad_list, metadata=metadata)
+                if uploader is not None:
+                    upload_queue.put((idx, ad_list))
                 logging.debug(
                     "...posting %d ads from %s (process_startd)",
                     len(ad_list),
@@ -265,16 +478,18 @@ def process_startd(
                 )
                 total_upload += time.time() - st
                 buffered_ads[idx] = []
+                buffered_bytes[idx] = 0
 
             count += 1
 
-            job_completion = job_ad.get("EnteredCurrentStatus")
-            if job_completion > last_completion:
-                last_completion = job_completion
-                since = {
-                    "GlobalJobId": job_ad.get("GlobalJobId"),
-                    "EnteredCurrentStatus": job_ad.get("EnteredCurrentStatus"),
-                }
+            # Keep only a reference to the newest ad; the since dict is
+            # rebuilt once after the loop instead of per new maximum
+            if ecs > last_completion:
+                last_completion = ecs
+                last_ad = job_ad
+
+            if count & _CHECK_MASK:
+                continue
 
             if utils.time_remaining(start_time) < 0:
                 message = f"History crawler on {startd_ad['Machine']} has been running for more than {utils.TIMEOUT_MINS:d} minutes; exiting."
@@ -287,37 +502,49 @@ def process_startd(
 
             if args.process_max_documents and count > args.process_max_documents:
                 logging.warning(
-                    "Aborting after %d documents (--process_max_documents option)"
-                    % args.process_max_documents
+                    "Aborting after %d documents (--process_max_documents option)",
+                    args.process_max_documents,
                 )
                 break
 
     except RuntimeError:
-        message = "Failed to query startd for job history: %s" % startd_ad["Machine"]
-        exc = traceback.format_exc()
-        message += f"\n{exc}"
-        logging.error(message)
+        _log_with_tb(
+            logging.ERROR, "Failed to query startd for job history: %s" % startd_ad["Machine"]
+        )
 
     except Exception as exn:
-        message = f"Failure when processing startd history query on {startd_ad['Machine']}: {str(exn)}"
-        exc = traceback.format_exc()
-        message += f"\n{exc}"
-        logging.exception(message)
+        message = _log_with_tb(
+            logging.ERROR,
+            f"Failure when processing startd history query on {startd_ad['Machine']}: {str(exn)}",
+        )
         utils.send_email_alert(
             args.email_alerts, "spider startd history query error", message
         )
 
-    # Post the remaining ads
-    for idx, ad_list in list(buffered_ads.items()):
-        if ad_list:
-            logging.debug(
-                "...posting remaining %d ads from %s " "(process_startd)",
-                len(ad_list),
-                startd_ad["Machine"],
-            )
-            if not args.read_only:
-                if args.es_feed_startd_history:
-                    elastic.post_ads(es.handle, idx, ad_list, metadata=metadata)
+    finally:
+        # Post the remaining ads and wait for the uploader to drain;
+        # this must run on every exit path or the uploader thread would
+        # block forever on an empty queue.
+        st = time.time()
+        for idx, ad_list in list(buffered_ads.items()):
+            if ad_list:
+                logging.debug(
+                    "...posting remaining %d ads from %s " "(process_startd)",
+                    len(ad_list),
+                    startd_ad["Machine"],
+                )
+                if uploader is not None:
+                    upload_queue.put((idx, ad_list))
+        if uploader is not None:
+            upload_queue.put(None)  # Send a poison pill
+            uploader.join()
+            total_upload += time.time() - st
+
+    if last_ad is not None:
+        since = {
+            "GlobalJobId": last_ad.get("GlobalJobId"),
+            "EnteredCurrentStatus": last_completion,
+        }
 
     total_time = (time.time() - my_start) / 60.0
     total_upload /= 60.0
@@ -333,38 +560,96 @@ def process_startd(
         total_upload,
     )
 
-    # If we got to this point without a timeout, all these jobs have
-    # been processed and uploaded, so we can update the checkpoint
-    if not timed_out:
+    n_failed = upload_failed[0] if upload_failed else 0
+    if n_failed:
+        logging.error(
+            "%d documents from %s failed to upload; not advancing the checkpoint",
+            n_failed,
+            startd_ad["Machine"],
+        )
+
+    # Only update the checkpoint if we got here without a timeout and
+    # every document actually reached ES; advancing it over a failed
+    # bulk would skip those ads forever
+    if not timed_out and not n_failed:
         checkpoint_queue.put((startd_ad["Machine"], since))
 
     return since
 
 
-def load_checkpoint():
+CHECKPOINT_DB = "checkpoint.db"
+
+
+def _checkpoint_db():
+    """
+    Open the checkpoint database, creating the schema on first use.
+    WAL mode gives O(1) row upserts with crash-safe atomicity, instead
+    of rewriting (and fsyncing) the whole state per update.
+    """
+    conn = sqlite3.connect(CHECKPOINT_DB)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS checkpoint(name TEXT PRIMARY KEY, value TEXT)"
+    )
+    _migrate_json_checkpoint(conn)
+    return conn
+
+
+def _migrate_json_checkpoint(conn):
+    """Import a pre-existing checkpoint.json into an empty database"""
+    if conn.execute("SELECT COUNT(*) FROM checkpoint").fetchone()[0]:
+        return
     try:
         with open("checkpoint.json", "r") as fd:
-            checkpoint = json.load(fd)
-    except IOError:
-        checkpoint = {}
+            legacy = json.load(fd)
+    except (IOError, ValueError):
+        return
+    conn.executemany(
+        "INSERT OR REPLACE INTO checkpoint(name, value) VALUES (?, ?)",
+        [(name, json.dumps(value)) for name, value in legacy.items()],
+    )
+    conn.commit()
+    logging.warning("Migrated %d entries from checkpoint.json to %s",
+                    len(legacy), CHECKPOINT_DB)
 
-    return checkpoint
 
+def load_checkpoint():
+    conn = _checkpoint_db()
+    try:
+        rows = conn.execute("SELECT name, value FROM checkpoint").fetchall()
+    finally:
+        conn.close()
 
-def update_checkpoint(name, completion_date):
-    checkpoint = load_checkpoint()
+    return {name: json.loads(value) for name, value in rows}
 
-    checkpoint[name] = completion_date
 
-    with open("checkpoint.json", "w") as fd:
-        json.dump(checkpoint, fd, indent=4)
+def update_checkpoints(updates):
+    """Upsert a batch of {name: completion} entries in one transaction"""
+    if not updates:
+        return
+    conn = _checkpoint_db()
+    try:
+        conn.executemany(
+            "INSERT INTO checkpoint(name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            [(name, json.dumps(value)) for name, value in updates.items()],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def update_checkpoint(name, completion_date):
+    update_checkpoints({name: completion_date})
 
 
 def process_histories(schedd_ads = [], startd_ads = [],
-                          starttime = None, pool = None, args = None, metadata = None):
+                          starttime = None, pool = None, args = None, metadata = None,
+                          es_handle = None):
     """
     Process history files for each schedd listed in a given
-    multiprocessing pool
+    thread pool
     """
     checkpoint = load_checkpoint()
 
@@ -372,8 +657,7 @@ def process_histories(schedd_ads = [], startd_ads = [],
     metadata = metadata or {}
     metadata["spider_source"] = "condor_history"
 
-    manager = multiprocessing.Manager()
-    checkpoint_queue = manager.Queue()
+    checkpoint_queue = queue.Queue()
 
     if len(schedd_ads) > 0:
         for schedd_ad in schedd_ads:
@@ -383,9 +667,10 @@ def process_histories(schedd_ads = [], startd_ads = [],
             # If there was no previous completion, get full history
             last_completion = checkpoint.get(name, 0)
 
-            future = pool.apply_async(
+            future = pool.submit(
                 process_schedd,
-                (starttime, last_completion, checkpoint_queue, schedd_ad, args, metadata),
+                starttime, last_completion, checkpoint_queue, schedd_ad, args, metadata,
+                es_handle,
             )
             futures.append((name, future))
 
@@ -396,27 +681,32 @@ def process_histories(schedd_ads = [], startd_ads = [],
             # Check for last completion time ("since")
             since = checkpoint.get(machine, {"GlobalJobId": "Unknown", "EnteredCurrentStatus": 0})
 
-            future = pool.apply_async(
+            future = pool.submit(
                 process_startd,
-                (starttime, since, checkpoint_queue, startd_ad, args, metadata),
+                starttime, since, checkpoint_queue, startd_ad, args, metadata,
+                es_handle,
             )
             futures.append((machine, future))
             
 
     def _chkp_updater():
+        # Coalesce updates in memory and upsert them in batched
+        # transactions at most every couple of seconds.
+        pending = {}
         while True:
             try:
-                job = checkpoint_queue.get()
-                if job is None:  # Swallow poison pill
-                    break
-            except EOFError as error:
-                logging.warning(
-                    "EOFError - Nothing to consume left in the queue %s", error
-                )
+                job = checkpoint_queue.get(timeout=2.0)
+            except queue.Empty:
+                if pending:
+                    update_checkpoints(pending)
+                    pending = {}
+                continue
+            if job is None:  # Swallow poison pill
                 break
-            update_checkpoint(*job)
+            pending[job[0]] = job[1]
+        update_checkpoints(pending)
 
-    chkp_updater = multiprocessing.Process(target=_chkp_updater)
+    chkp_updater = threading.Thread(target=_chkp_updater)
     chkp_updater.start()
 
     # Check if the entire pool and/or one of the processes has timed out
@@ -426,25 +716,23 @@ def process_histories(schedd_ads = [], startd_ads = [],
         # Allow a 30 second buffer for processes to finish
         if utils.time_remaining(starttime, positive=False) > -30:
             try:
-                # Each process gets a minimum of 10 seconds to produce output
-                future.get(utils.time_remaining(starttime) + 10)
-            except multiprocessing.TimeoutError:
+                # Each worker gets a minimum of 10 seconds to produce output
+                future.result(timeout=utils.time_remaining(starttime) + 10)
+            except concurrent.futures.TimeoutError:
                 # This implies that the checkpoint hasn't been updated
-                message = "Daemon %s history timed out; ignoring progress." % name
-                exc = traceback.format_exc()
-                message += f"\n{exc}"
-                logging.error(message)
+                message = _log_with_tb(
+                    logging.ERROR,
+                    "Daemon %s history timed out; ignoring progress." % name,
+                )
                 utils.send_email_alert(
                     args.email_alerts, "spider history timeout warning", message
                 )
             except elasticsearch.exceptions.TransportError:
-                message = (
+                message = _log_with_tb(
+                    logging.ERROR,
                     "Transport error while sending history data of %s; ignoring progress."
-                    % name
+                    % name,
                 )
-                exc = traceback.format_exc()
-                message += f"\n{exc}"
-                logging.error(message)
                 utils.send_email_alert(
                     args.email_alerts, "spider history transport error warning", message
                 )
@@ -453,7 +741,16 @@ def process_histories(schedd_ads = [], startd_ads = [],
             logging.error("Processing the entire queue took too long, stopping early")
             break
     if timed_out:
-        pool.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # Put back the pre-bulk settings on everything we bulk-loaded. The
+    # handle's own record is used rather than the workers' results so
+    # indices touched by a worker that timed out are still restored.
+    if not args.read_only and (
+        args.es_feed_schedd_history or args.es_feed_startd_history
+    ):
+        es = es_handle if es_handle is not None else elastic.get_server_handle(args)
+        es.restore_all_bulk_settings()
 
     checkpoint_queue.put(None)  # Send a poison pill
     chkp_updater.join()
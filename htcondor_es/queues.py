@@ -8,10 +8,11 @@ import resource
 import traceback
 import queue
 import multiprocessing
+import concurrent.futures
 
 import htcondor
 
-from . import utils, convert
+from . import elastic, utils, convert
 
 
 class ListenAndBunch(multiprocessing.Process):
@@ -238,9 +239,10 @@ def process_queues(schedd_ads, starttime, pool, args, metadata=None):
     metadata = metadata or {}
     metadata["spider_source"] = "condor_queue"
 
-    mp_manager = multiprocessing.Manager()
-    input_queue = mp_manager.Queue()
-    output_queue = mp_manager.Queue()
+    # Plain multiprocessing queues talk to the listener process directly,
+    # without proxying every put/get through a Manager server process.
+    input_queue = multiprocessing.Queue()
+    output_queue = multiprocessing.Queue()
     listener = ListenAndBunch(
         input_queue=input_queue,
         output_queue=output_queue,
@@ -249,11 +251,14 @@ def process_queues(schedd_ads, starttime, pool, args, metadata=None):
     )
     futures = []
 
-    upload_pool = multiprocessing.Pool(processes=args.process_parallel_queries)
+    upload_pool = multiprocessing.Pool(
+        processes=args.process_parallel_queries,
+        initializer=elastic.reset_server_handle,
+    )
 
     for schedd_ad in schedd_ads:
-        future = pool.apply_async(
-            query_schedd_queue, args=(starttime, schedd_ad, input_queue, args)
+        future = pool.submit(
+            query_schedd_queue, starttime, schedd_ad, input_queue, args
         )
         futures.append((schedd_ad["Name"], future))
 
@@ -299,15 +304,18 @@ def process_queues(schedd_ads, starttime, pool, args, metadata=None):
     for name, future in futures:
         if utils.time_remaining(starttime, positive=False) > -20:
             try:
-                count = future.get(utils.time_remaining(starttime) + 10)
                 if name == "UPLOADER_ES":
-                    total_sent += count
+                    # ES uploaders still run in the multiprocessing pool
+                    total_sent += future.get(utils.time_remaining(starttime) + 10)
                 else:
+                    count = future.result(
+                        timeout=utils.time_remaining(starttime) + 10
+                    )
                     try:
                         total_queried += count
                     except TypeError:
                         pass
-            except multiprocessing.TimeoutError:
+            except (multiprocessing.TimeoutError, concurrent.futures.TimeoutError):
                 message = "Schedd %s queue timed out; ignoring progress." % name
                 logging.error(message)
                 utils.send_email_alert(
@@ -319,7 +327,7 @@ def process_queues(schedd_ads, starttime, pool, args, metadata=None):
 
     if timed_out:
         logging.error("Timed out when retrieving uploaders. Upload count incomplete.")
-        pool.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
         upload_pool.terminate()
 
     if not total_queried == total_processed:
@@ -7,9 +7,9 @@ import time
 import signal
 import logging
 import argparse
-import multiprocessing
+import concurrent.futures
 
-from . import history, queues, utils
+from . import elastic, history, queues, utils
 
 
 def main_driver(args):
@@ -32,9 +32,24 @@ def main_driver(args):
         startd_ads = utils.get_startds(args)
         logging.warning("&&& There are %d startds to query.", len(startd_ads))
 
-    with multiprocessing.Pool(processes=args.process_parallel_queries, maxtasksperchild=1) as pool:
+    # The workers are I/O-bound (htcondor queries + ES posts) and the
+    # htcondor bindings release the GIL, so threads beat fork+pickle here.
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=args.process_parallel_queries
+    ) as pool:
         metadata = utils.collect_metadata()
 
+        # One client (and thus one keep-alive connection pool) shared by
+        # every history worker thread for the whole run. The queue feed
+        # is deliberately excluded: its uploaders are forked processes
+        # and must not inherit a client with open sockets, so they build
+        # their own handles post-fork via get_server_handle.
+        es_handle = None
+        if not args.read_only and (
+            args.es_feed_schedd_history or args.es_feed_startd_history
+        ):
+            es_handle = elastic.get_server_handle(args)
+
         if args.process_schedd_history:
             history.process_histories(
                 schedd_ads=schedd_ads,
@@ -42,6 +57,7 @@ def main_driver(args):
                 pool=pool,
                 args=args,
                 metadata=metadata,
+                es_handle=es_handle,
             )
 
         # Now that we have the fresh history, process the queues themselves.
@@ -61,6 +77,7 @@ def main_driver(args):
                 pool=pool,
                 args=args,
                 metadata=metadata,
+                es_handle=es_handle,
             )
 
     logging.warning(
@@ -172,6 +189,24 @@ def main():
             f"[default: {defaults['es_bunch_size']}]"
         )
     )
+    parser.add_argument(
+        "--es_max_chunk_bytes",
+        type=int,
+        dest="es_max_chunk_bytes",
+        help=(
+            "Maximum size (in bytes) of a single bulk request sent to ES "
+            f"[default: {defaults['es_max_chunk_bytes']}]"
+        )
+    )
+    parser.add_argument(
+        "--upload_pool_size",
+        type=int,
+        dest="upload_pool_size",
+        help=(
+            "Number of parallel uploader threads posting to ES per daemon "
+            f"[default: {defaults['upload_pool_size']}]"
+        )
+    )
     parser.add_argument(
         "--es_feed_schedd_history",
         action="store_const",
@@ -249,6 +284,24 @@ def main():
             "[default: none]"
         ),
     )
+    parser.add_argument(
+        "--use_condor_history_binary",
+        action="store_true",
+        dest="use_condor_history_binary",
+        help=(
+            "Stream schedd history from the condor_history binary (JSONL "
+            "output) instead of the Python bindings."
+        ),
+    )
+    parser.add_argument(
+        "--full_attrs",
+        action="store_true",
+        dest="full_attrs",
+        help=(
+            "Query history with an empty projection (all ClassAd attributes) "
+            "instead of the attributes the converter knows about."
+        ),
+    )
     parser.add_argument(
         "--read_only",
         action="store_true",
@@ -33,7 +33,9 @@ def default_config():
         'process_parallel_queries' : 8,
         'es_host'                  : 'localhost',
         'es_port'                  : 9200,
-        'es_bunch_size'            : 250,
+        'es_bunch_size'            : 1000,
+        'es_max_chunk_bytes'       : 10 * 1024 * 1024,
+        'upload_pool_size'         : 4,
         'es_feed_schedd_history'   : False,
         'es_feed_schedd_queue'     : False,
         'es_feed_startd_history'   : False,
@@ -43,10 +45,20 @@ def default_config():
     return defaults
 
 
+def _fill_defaults(args, defaults):
+    """Backfill options left unset by both the commandline and the config file"""
+    for key, value in defaults.items():
+        if getattr(args, key, None) is None:
+            setattr(args, key, value)
+    return args
+
+
 def load_config(args):
     defaults = default_config()
-    if (args is None) or (args.config_file is None):
+    if args is None:
         return args
+    if args.config_file is None:
+        return _fill_defaults(args, defaults)
 
     config = configparser.ConfigParser(
         allow_no_value=True,
@@ -109,6 +121,12 @@ def load_config(args):
         if args.get('es_bunch_size') is None:
             args['es_bunch_size'] = es.getint(
                 'bunch_size', fallback=defaults['es_bunch_size'])
+        if args.get('es_max_chunk_bytes') is None:
+            args['es_max_chunk_bytes'] = es.getint(
+                'max_chunk_bytes', fallback=defaults['es_max_chunk_bytes'])
+        if args.get('upload_pool_size') is None:
+            args['upload_pool_size'] = es.getint(
+                'upload_pool_size', fallback=defaults['upload_pool_size'])
         if args.get('es_feed_schedd_history') is None:
             args['es_feed_schedd_history'] = es.getboolean(
                 'feed_schedd_history', fallback=defaults['es_feed_schedd_history'])
@@ -127,7 +145,7 @@ def load_config(args):
 
     # convert args back to a namespace object
     args = Namespace(**args)
-    return args
+    return _fill_defaults(args, defaults)
 
 
 def get_schedds(args=None):
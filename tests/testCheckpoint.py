@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Tests for the SQLite checkpoint store in htcondor_es.history:
+migration from the legacy checkpoint.json, batched upserts, and the
+load round-trip. Runnable under pytest or directly as a script.
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+try:
+    import htcondor_es
+except ImportError:
+    if os.path.exists("src/htcondor_es/__init__.py") and "src" not in sys.path:
+        sys.path.append("src")
+
+from htcondor_es import history
+
+
+def test_empty_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert history.load_checkpoint() == {}
+
+
+def test_update_and_load_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    history.update_checkpoint("schedd1.example.com", 1700000000)
+    history.update_checkpoints(
+        {
+            "schedd1.example.com": 1700000100,
+            "startd1.example.com": {
+                "GlobalJobId": "job#1",
+                "EnteredCurrentStatus": 1700000200,
+            },
+        }
+    )
+    history.update_checkpoints({})  # no-op, must not clobber anything
+
+    checkpoint = history.load_checkpoint()
+    # The second update upserted over the first
+    assert checkpoint["schedd1.example.com"] == 1700000100
+    assert checkpoint["startd1.example.com"] == {
+        "GlobalJobId": "job#1",
+        "EnteredCurrentStatus": 1700000200,
+    }
+
+
+def test_migrate_json_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    legacy = {
+        "schedd1.example.com": 1600000000,
+        "startd1.example.com": {
+            "GlobalJobId": "job#2",
+            "EnteredCurrentStatus": 1600000001,
+        },
+    }
+    with open("checkpoint.json", "w") as fd:
+        json.dump(legacy, fd)
+
+    assert history.load_checkpoint() == legacy
+
+    # Migration only fills an empty database; once it holds rows, the
+    # legacy file must not overwrite newer state
+    history.update_checkpoint("schedd1.example.com", 1600000005)
+    assert history.load_checkpoint()["schedd1.example.com"] == 1600000005
+
+
+if __name__ == "__main__":
+
+    class _Chdir:
+        """Stand-in for the pytest monkeypatch fixture"""
+
+        def chdir(self, path):
+            os.chdir(path)
+
+    for test in (
+        test_empty_checkpoint,
+        test_update_and_load_roundtrip,
+        test_migrate_json_checkpoint,
+    ):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            test(tmpdir, _Chdir())
+            print("%s passed" % test.__name__)